@@ -1,77 +1,239 @@
 import os
-import re
 import logging
 import asyncio
+import functools
+import heapq
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Dict, Tuple, Optional
-from aiogram import Bot, F, Router
+from typing import Any, Awaitable, Callable, Dict, List, Tuple, Optional
+
+import aiosqlite
+from aiogram import BaseMiddleware, Bot, F, Router
 from aiogram.dispatcher.filters import Command
 from aiogram.exceptions import TelegramAPIError
 from aiogram.types import Message, Chat
+from cachetools import TTLCache
 from dotenv import load_dotenv
 
 from filter_media import SupportedMediaFilter
 
 load_dotenv()
-GROUP_ID = os.getenv("GROUP_ID")
+try:
+    GROUP_ID = int(os.environ["GROUP_ID"])
+except (KeyError, ValueError):
+    raise RuntimeError("GROUP_ID должен быть задан и быть целым числом (id группы)") from None
 GROUP_TYPE = os.getenv('GROUP_TYPE', default='group')
+if GROUP_TYPE not in ('group', 'supergroup', 'private'):
+    raise RuntimeError("GROUP_TYPE должен быть одним из: group, supergroup, private")
+
+# Группа может превратиться в супергруппу, поэтому для group
+# принимаются сообщения из обоих типов чатов
+_GROUP_TYPES = (frozenset({GROUP_TYPE, 'supergroup'}) if GROUP_TYPE == 'group'
+                else frozenset({GROUP_TYPE}))
 
+# В роутере регистрируются только обработчики message, поэтому
+# resolve_used_update_types() запрашивает у Telegram только этот тип
 router = Router()
 
+# Ссылка на профиль пользователя в пересланных в группу сообщениях
+_USER_LINK_PREFIX = 'tg://user?id='
+
+# Ограничения на длину пересылаемого текста и описания медиа
+_MAX_MSG_LEN = 4000
+_MAX_CAPTION_LEN = 1000
+
+# Ответы заблокированным пользователям
+_BANNED_TEMPLATE = ("❌ Вы были заблокированы администратором.\n"
+                    "Причина: %s\n"
+                    "Ваши сообщения не будут обработаны.")
+_MUTED_TEMPLATE = ("❌ Вы были замучены администратором.\n"
+                   "Причина: %s\n"
+                   "Оставшееся время: %s\n"
+                   "Ваши сообщения не будут обработаны до размута.")
+
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Хранилище для замученных пользователей: {user_id: (время_размута, причина)}
-muted_users: Dict[int, Tuple[datetime, str]] = {}
+@dataclass(slots=True, frozen=True)
+class MuteRecord:
+    """Запись о муте пользователя"""
+    deadline: float  # срок размута по time.monotonic()
+    end_wall: datetime  # время размута для отображения
+    reason: str
+
+# Хранилище для замученных пользователей: {user_id: MuteRecord}
+muted_users: Dict[int, MuteRecord] = {}
 
 # Хранилище для забаненных пользователей: {user_id: причина}
+# Сохраняется в SQLite, словарь служит кэшем для проверок на каждом сообщении
 banned_users: Dict[int, str] = {}
 
+# Соединение с базой, в которой хранятся баны
+_db: Optional[aiosqlite.Connection] = None
+
+# Кэш профилей пользователей для /info: {user_id: Chat}, живёт 5 минут
+_chat_cache: TTLCache = TTLCache(maxsize=1024, ttl=300)
+
+# Ограничивает число одновременных запросов к Telegram при массовых
+# действиях администраторов и размутах
+_telegram_semaphore = asyncio.Semaphore(8)
+
+# Пользователи, над которыми недавно выполнялась команда: не чаще раза в секунду
+_recent_admin_actions: TTLCache = TTLCache(maxsize=1024, ttl=1)
+
+# Очередь сроков размута: куча из (срок_по_time.monotonic(), user_id).
+# Записи не удаляются при размуте/повторном муте - устаревшие
+# отбрасываются при извлечении сверкой с muted_users.
+_mute_heap: List[Tuple[float, int]] = []
+
+# Будит задачу проверки мутов при изменении очереди сроков
+_mute_wakeup = asyncio.Event()
+
+async def init_storage(path: str) -> None:
+    """Открывает базу с банами и загружает их в banned_users"""
+    global _db
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    _db = await aiosqlite.connect(path)
+    await _db.execute('PRAGMA journal_mode=WAL')
+    await _db.execute(
+        'CREATE TABLE IF NOT EXISTS bans(uid INTEGER PRIMARY KEY, reason TEXT)'
+    )
+    await _db.commit()
+    async with _db.execute('SELECT uid, reason FROM bans') as cursor:
+        async for uid, reason in cursor:
+            banned_users[uid] = reason
+    logger.info("Loaded %d banned users from %s", len(banned_users), path)
+
+async def close_storage() -> None:
+    """Закрывает соединение с базой"""
+    global _db
+    if _db is not None:
+        await _db.close()
+        _db = None
+
+async def save_ban(user_id: int, reason: str) -> None:
+    """Сохраняет бан пользователя в базе"""
+    await _db.execute('INSERT OR REPLACE INTO bans VALUES(?, ?)', (user_id, reason))
+    await _db.commit()
+
+async def delete_ban(user_id: int) -> None:
+    """Удаляет бан пользователя из базы"""
+    await _db.execute('DELETE FROM bans WHERE uid = ?', (user_id,))
+    await _db.commit()
+
+async def limited(coro: Awaitable[Any]) -> Any:
+    """Выполняет запрос к Telegram, соблюдая общий лимит одновременных запросов"""
+    async with _telegram_semaphore:
+        return await coro
+
+async def _check_mute_expirations_once(bot: Bot) -> None:
+    """Снимает истёкшие муты и ждёт следующего срока или нового мута"""
+    current_time = time.monotonic()
+
+    expired_users = []
+
+    # Достаём из кучи только те муты, срок которых истёк
+    while _mute_heap and _mute_heap[0][0] <= current_time:
+        deadline, user_id = heapq.heappop(_mute_heap)
+        entry = muted_users.get(user_id)
+        if entry is None or entry.deadline != deadline:
+            # Пользователя уже размутили или замутили заново
+            continue
+
+        del muted_users[user_id]
+        expired_users.append(user_id)
+
+    # Уведомляем всех размученных пользователей одновременно
+    results = await asyncio.gather(
+        *(limited(bot.send_message(
+            chat_id=user_id,
+            text="✅ С вас автоматически сняты ограничения. Вы можете снова писать в бота."
+        )) for user_id in expired_users),
+        return_exceptions=True
+    )
+    for user_id, result in zip(expired_users, results):
+        if isinstance(result, Exception):
+            logger.warning("Failed to notify user %d about unmute: %s", user_id, result)
+        else:
+            logger.info("User %d automatically unmuted", user_id)
+
+    # Спим до ближайшего истечения мута или до нового мута/размута
+    sleep_for = None
+    if _mute_heap:
+        sleep_for = max(1, _mute_heap[0][0] - time.monotonic())
+    try:
+        await asyncio.wait_for(_mute_wakeup.wait(), timeout=sleep_for)
+    except asyncio.TimeoutError:
+        pass
+    _mute_wakeup.clear()
+
 # Фоновая задача для проверки истечения мутов
 async def check_mute_expirations(bot: Bot):
-    """Фоновая задача для автоматического размута пользователей"""
+    """
+    Фоновая задача для автоматического размута пользователей.
+    При ошибках перезапускает проверку с экспоненциальной задержкой
+    """
+    backoff = 1
     while True:
         try:
-            current_time = datetime.now()
-            expired_users = []
-            
-            # Проверяем, чьи муты истекли
-            for user_id, (unmute_time, reason) in muted_users.items():
-                if current_time >= unmute_time:
-                    expired_users.append(user_id)
-            
-            # Размучиваем пользователей
-            for user_id in expired_users:
-                del muted_users[user_id]
-                try:
-                    await bot.send_message(
-                        chat_id=user_id,
-                        text="✅ С вас автоматически сняты ограничения. Вы можете снова писать в бота."
-                    )
-                    logger.info(f"User {user_id} automatically unmuted")
-                except Exception as e:
-                    logger.warning(f"Failed to notify user {user_id} about unmute: {e}")
-            
-            await asyncio.sleep(60)  # Проверяем каждую минуту
-        except Exception as e:
-            logger.error(f"Error in mute expiration checker: {e}")
-            await asyncio.sleep(60)
+            await _check_mute_expirations_once(bot)
+            backoff = 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Error in mute expiration checker, retrying in %d s", backoff)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60)
 
 def extract_user_id(message: Message) -> int:
     """Извлекает ID пользователя из сообщения"""
-    text_to_search = ""
-    if message.text:
-        text_to_search = message.text
-    elif message.caption:
-        text_to_search = message.caption
-    
-    if text_to_search:
-        match = re.search(r'tg://user\?id=(\d+)', text_to_search)
-        if match:
-            return int(match.group(1))
+    text_to_search = message.text or message.caption or ""
+
+    start = text_to_search.find(_USER_LINK_PREFIX)
+    while start >= 0:
+        start += len(_USER_LINK_PREFIX)
+        end = start
+        while end < len(text_to_search) and '0' <= text_to_search[end] <= '9':
+            end += 1
+        if end > start:
+            return int(text_to_search[start:end])
+        start = text_to_search.find(_USER_LINK_PREFIX, end)
     raise ValueError("Не могу извлечь Id")
 
+async def notify_user_and_reply(message: Message, bot: Bot, user_id: int,
+                                user_text: str, reply_text: str) -> None:
+    """
+    Уведомляет пользователя и отвечает администратору одновременно.
+    Действие к этому моменту уже применено, поэтому если уведомление
+    не доставлено (например, пользователь заблокировал бота), администратору
+    сообщается только об этом
+    """
+    sent, replied = await asyncio.gather(
+        limited(bot.send_message(chat_id=user_id, text=user_text)),
+        limited(message.reply(reply_text)),
+        return_exceptions=True
+    )
+    if isinstance(replied, Exception):
+        logger.warning("Failed to reply to admin %d: %s", message.from_user.id, replied)
+    if isinstance(sent, TelegramAPIError):
+        await message.reply(f"⚠️ Пользователь не получил уведомление: {sent.message}")
+    elif isinstance(sent, Exception):
+        raise sent
+
+async def get_chat_cached(bot: Bot, user_id: int) -> Chat:
+    """Получает профиль пользователя, используя кэш"""
+    chat = _chat_cache.get(user_id)
+    if chat is None:
+        chat = await bot.get_chat(user_id)
+        _chat_cache[user_id] = chat
+    return chat
+
+def format_datetime(dt: datetime) -> str:
+    """Форматирует дату и время как ДД.ММ.ГГГГ ЧЧ:ММ"""
+    return f"{dt.day:02d}.{dt.month:02d}.{dt.year} {dt.hour:02d}:{dt.minute:02d}"
+
 def get_name(chat: Chat) -> str:
     """Получает полное имя пользователя"""
     if not chat.first_name:
@@ -91,81 +253,99 @@ def parse_duration(duration_str: str) -> Tuple[int, str]:
     
     total_minutes = 0
     time_parts = []
-    
-    # Ищем часы
-    hours_match = re.search(r'(\d+)ч', duration_str)
-    if hours_match:
-        hours = int(hours_match.group(1))
-        total_minutes += hours * 60
-        time_parts.append(f"{hours}ч")
-    
-    # Ищем минуты
-    minutes_match = re.search(r'(\d+)м', duration_str)
-    if minutes_match:
-        minutes = int(minutes_match.group(1))
-        total_minutes += minutes
-        time_parts.append(f"{minutes}м")
-    
+    number = None  # число, набранное перед единицей измерения
+    digits_only = True
+
+    # Разбираем строку за один проход: число и сразу за ним "ч" или "м"
+    for char in duration_str:
+        if '0' <= char <= '9':
+            number = (number or 0) * 10 + ord(char) - 48
+            continue
+        digits_only = False
+        if number is not None and (char == 'ч' or char == 'м'):
+            total_minutes += number * 60 if char == 'ч' else number
+            time_parts.append(f"{number}{char}")
+        number = None
+
     if total_minutes == 0:
-        # Если не найдено, используем значение как часы
-        try:
-            hours = int(duration_str)
-            total_minutes = hours * 60
-            time_parts.append(f"{hours}ч")
-        except ValueError:
+        time_parts = []
+        if digits_only:
+            # Единицы не указаны, используем значение как часы
+            total_minutes = number * 60
+            time_parts.append(f"{number}ч")
+        if total_minutes == 0:
             total_minutes = 60  # по умолчанию 1 час
-            time_parts.append("1ч")
+            time_parts = ["1ч"]
     
     # Ограничиваем максимальное время (24 часа = 1440 минут)
     total_minutes = min(total_minutes, 1440)
     
     return total_minutes, ' '.join(time_parts)
 
-def is_user_muted(user_id: int) -> bool:
-    """Проверяет, замучен ли пользователь"""
-    if user_id in muted_users:
-        unmute_time, _ = muted_users[user_id]
-        if datetime.now() < unmute_time:
-            return True
-        else:
-            # Мут истёк, удаляем из списка
-            del muted_users[user_id]
-            return False
-    return False
+def is_user_muted(user_id: int) -> Optional[MuteRecord]:
+    """
+    Проверяет, замучен ли пользователь
+    Возвращает: запись о муте или None, если мута нет
+    """
+    record = muted_users.get(user_id)
+    if record is None:
+        return None
+    if time.monotonic() < record.deadline:
+        return record
+    # Мут истёк, удаляем из списка
+    del muted_users[user_id]
+    return None
+
+def remaining_minutes(record: MuteRecord) -> int:
+    """Возвращает оставшееся время мута в целых минутах"""
+    return max(0, int(record.deadline - time.monotonic()) // 60)
+
+@functools.lru_cache(maxsize=2048)
+def format_remaining(total_minutes: int) -> str:
+    """Форматирует оставшееся время мута, например: 2ч 15мин, 40мин"""
+    hours, minutes = divmod(total_minutes, 60)
+    return f"{hours}ч {minutes}мин" if hours > 0 else f"{minutes}мин"
 
 def is_user_banned(user_id: int) -> bool:
     """Проверяет, забанен ли пользователь"""
     return user_id in banned_users
 
+
+class AccessGateMiddleware(BaseMiddleware):
+    """
+    Не пропускает к обработчикам личные сообщения от забаненных
+    и замученных пользователей, отвечая им причиной блокировки
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: Dict[str, Any],
+    ) -> Any:
+        if event.chat.type != 'private':
+            return await handler(event, data)
+
+        user_id = event.from_user.id
+        reason = banned_users.get(user_id)
+        if reason is not None:
+            await event.reply(_BANNED_TEMPLATE % reason)
+            return
+
+        mute = is_user_muted(user_id)
+        if mute is not None:
+            time_str = format_remaining(remaining_minutes(mute))
+            await event.reply(_MUTED_TEMPLATE % (mute.reason, time_str))
+            return
+
+        return await handler(event, data)
+
+
+router.message.middleware(AccessGateMiddleware())
+
 @router.message(Command(commands=["start"]))
 async def command_start(message: Message) -> None:
     """Обработчик команды /start"""
-    # Проверяем, забанен ли пользователь
-    if is_user_banned(message.from_user.id):
-        reason = banned_users[message.from_user.id]
-        await message.answer(
-            f"❌ Вы были заблокированы администратором.\n"
-            f"Причина: {reason}\n"
-            f"Ваши сообщения не будут обработаны."
-        )
-        return
-    
-    # Проверяем, замучен ли пользователь
-    if is_user_muted(message.from_user.id):
-        unmute_time, reason = muted_users[message.from_user.id]
-        remaining = unmute_time - datetime.now()
-        hours, remainder = divmod(int(remaining.total_seconds()), 3600)
-        minutes, _ = divmod(remainder, 60)
-        time_str = f"{hours}ч {minutes}мин" if hours > 0 else f"{minutes}мин"
-        
-        await message.answer(
-            f"❌ Вы были замучены администратором.\n"
-            f"Причина: {reason}\n"
-            f"Оставшееся время: {time_str}\n"
-            f"Ваши сообщения не будут обработаны до размута."
-        )
-        return
-    
     await message.answer(
         "Привет! Мы - команда поддержки. Если у вас есть вопрос, "
         "напишите нам, мы с радостью на него ответим.",
@@ -174,48 +354,22 @@ async def command_start(message: Message) -> None:
 @router.message(F.chat.type == 'private', F.text)
 async def send_message_to_group(message: Message, bot: Bot):
     """Пересылает текстовые сообщения от пользователя в группу"""
-    # Проверяем, забанен ли пользователь
-    if is_user_banned(message.from_user.id):
-        reason = banned_users[message.from_user.id]
-        await message.reply(
-            f"❌ Вы были заблокированы администратором.\n"
-            f"Причина: {reason}\n"
-            f"Ваши сообщения не будут обработаны."
-        )
-        return
-    
-    # Проверяем, замучен ли пользователь
-    if is_user_muted(message.from_user.id):
-        unmute_time, reason = muted_users[message.from_user.id]
-        remaining = unmute_time - datetime.now()
-        hours, remainder = divmod(int(remaining.total_seconds()), 3600)
-        minutes, _ = divmod(remainder, 60)
-        time_str = f"{hours}ч {minutes}мин" if hours > 0 else f"{minutes}мин"
-        
-        await message.reply(
-            f"❌ Вы были замучены администратором.\n"
-            f"Причина: {reason}\n"
-            f"Оставшееся время: {time_str}\n"
-            f"Ваши сообщения не будут обработаны до размута."
-        )
-        return
-    
-    if len(message.text) > 4000:
-        return await message.reply(text='Сообщение слишком длинное (максимум 4000 символов)')
-    
+    if len(message.text) > _MAX_MSG_LEN:
+        return await message.reply(text=f'Сообщение слишком длинное (максимум {_MAX_MSG_LEN} символов)')
+
     await bot.send_message(
         chat_id=GROUP_ID,
-        text=(
-            f'Имя: {message.from_user.full_name}\n'
-            f'Профиль: tg://user?id={message.from_user.id}\n\n'
-            f'{message.text}'
-        ),
+        text=''.join((
+            'Имя: ', message.from_user.full_name,
+            '\nПрофиль: ', _USER_LINK_PREFIX, str(message.from_user.id),
+            '\n\n', message.text
+        )),
         parse_mode='HTML'
     )
-    logger.info(f"User {message.from_user.id} sent message to group")
+    logger.info("User %d sent message to group", message.from_user.id)
 
 @router.message(Command(commands="info"),
-                F.chat.type == GROUP_TYPE,
+                F.chat.type.in_(_GROUP_TYPES),
                 F.reply_to_message)
 async def get_user_info(message: Message, bot: Bot):
     """Получает информацию о пользователе по команде /info"""
@@ -225,7 +379,7 @@ async def get_user_info(message: Message, bot: Bot):
         return await message.reply(str(err))
 
     try:
-        user = await bot.get_chat(user_id)
+        user = await get_chat_cached(bot, user_id)
     except TelegramAPIError as err:
         await message.reply(
             text=(f'Невозможно найти пользователя с таким Id. Текст ошибки:\n'
@@ -239,36 +393,144 @@ async def get_user_info(message: Message, bot: Bot):
     status_info = "Нет"
     if user_id in banned_users:
         status_info = f"Забанен: {banned_users[user_id]}"
-    elif user_id in muted_users:
-        unmute_time, reason = muted_users[user_id]
-        if datetime.now() < unmute_time:
-            remaining = unmute_time - datetime.now()
-            hours, remainder = divmod(int(remaining.total_seconds()), 3600)
-            minutes, _ = divmod(remainder, 60)
-            time_str = f"{hours}ч {minutes}мин" if hours > 0 else f"{minutes}мин"
-            status_info = f"Замучен (до {unmute_time.strftime('%d.%m.%Y %H:%M')}, осталось {time_str})"
-        else:
-            # Мут истёк, удаляем
-            del muted_users[user_id]
+    elif (mute := is_user_muted(user_id)) is not None:
+        time_str = format_remaining(remaining_minutes(mute))
+        status_info = f"Замучен (до {format_datetime(mute.end_wall)}, осталось {time_str})"
     
     await message.reply(text=f'Имя: {get_name(user)}\n'
                              f'Id: {user.id}\n'
                              f'username: {username}\n'
                              f'Статус: {status_info}')
-    logger.info(f"Admin {message.from_user.id} requested info for user {user_id}")
+    logger.info("Admin %d requested info for user %d", message.from_user.id, user_id)
 
-@router.message(F.chat.type == GROUP_TYPE, F.reply_to_message, ~F.text.startswith('/'))
+@router.message(F.chat.type.in_(_GROUP_TYPES), F.reply_to_message, ~F.text.startswith('/'))
 async def send_message_answer(message: Message, bot: Bot):
     """Пересылает ответ администратора пользователю"""
     try:
         chat_id = extract_user_id(message.reply_to_message)
         await message.copy_to(chat_id)
-        logger.info(f"Admin {message.from_user.id} sent answer to user {chat_id}")
+        logger.info("Admin %d sent answer to user %d", message.from_user.id, chat_id)
     except ValueError as err:
         await message.reply(text=f'Не могу извлечь Id. Возможно он некорректный. Текст ошибки:\n{str(err)}')
     except TelegramAPIError as err:
         await message.reply(text=f'Ошибка при отправке сообщения пользователю: {err.message}')
 
+async def _cmd_ban(message: Message, bot: Bot, user_id: int, args: str) -> None:
+    """/ban [причина] - блокирует пользователя"""
+    try:
+        # Парсим причину бана
+        reason = args or "Заблокирован администратором"
+
+        # Добавляем в список забаненных
+        banned_users[user_id] = reason
+        await save_ban(user_id, reason)
+
+        # Удаляем из списка замученных, если был замучен
+        if user_id in muted_users:
+            del muted_users[user_id]
+
+        await notify_user_and_reply(
+            message, bot, user_id,
+            user_text=f"⚠️ Вы были заблокированы администратором.\nПричина: {reason}",
+            reply_text="✅ Пользователь заблокирован."
+        )
+    except TelegramAPIError as e:
+        await message.reply(f"❌ Ошибка при блокировке: {e.message}")
+
+async def _cmd_mute(message: Message, bot: Bot, user_id: int, args: str) -> None:
+    """/mute [время] [причина] - мутит пользователя"""
+    try:
+        # Проверяем, не забанен ли пользователь
+        if user_id in banned_users:
+            await message.reply("❌ Пользователь забанен. Сначала разбаньте его.")
+            return
+
+        # Парсим время мута (по умолчанию 1 час)
+        reason = "Нарушение правил"
+
+        if args:
+            duration_parts = args.split(maxsplit=1)
+            duration_str = duration_parts[0]
+            if len(duration_parts) > 1:
+                reason = duration_parts[1]
+        else:
+            duration_str = "1ч"
+
+        # Парсим длительность
+        total_minutes, time_display = parse_duration(duration_str)
+
+        if total_minutes <= 0:
+            total_minutes = 60  # по умолчанию 1 час
+            time_display = "1ч"
+
+        # Добавляем в список замученных
+        deadline = time.monotonic() + total_minutes * 60
+        unmute_time = datetime.now() + timedelta(minutes=total_minutes)
+        muted_users[user_id] = MuteRecord(deadline, unmute_time, reason)
+        heapq.heappush(_mute_heap, (deadline, user_id))
+        _mute_wakeup.set()
+
+        # Форматируем время окончания
+        end_time_str = format_datetime(unmute_time)
+
+        await notify_user_and_reply(
+            message, bot, user_id,
+            user_text=f"🔇 Вы были замучены администратором на {time_display}.\n"
+                      f"Причина: {reason}\n"
+                      f"Ваши сообщения больше не будут обработаны до {end_time_str}.",
+            reply_text=f"✅ Пользователь замучен на {time_display}."
+        )
+    except TelegramAPIError as e:
+        await message.reply(f"❌ Ошибка при муте: {e.message}")
+
+async def _cmd_unmute(message: Message, bot: Bot, user_id: int, args: str) -> None:
+    """/unmute - снимает мут с пользователя"""
+    try:
+        # Убираем из списка замученных
+        if user_id in muted_users:
+            del muted_users[user_id]
+            _mute_wakeup.set()
+            await notify_user_and_reply(
+                message, bot, user_id,
+                user_text="✅ С вас сняты ограничения. Вы можете снова писать в бота.",
+                reply_text="✅ С пользователя сняты ограничения."
+            )
+        else:
+            await message.reply("❌ Пользователь не замучен.")
+    except TelegramAPIError as e:
+        await message.reply(f"❌ Ошибка при размуте: {e.message}")
+
+async def _cmd_unban(message: Message, bot: Bot, user_id: int, args: str) -> None:
+    """/unban - разблокирует пользователя"""
+    try:
+        # Убираем из списка забаненных
+        if user_id in banned_users:
+            del banned_users[user_id]
+            await delete_ban(user_id)
+            await notify_user_and_reply(
+                message, bot, user_id,
+                user_text="✅ Вы были разблокированы администратором.",
+                reply_text="✅ Пользователь разблокирован."
+            )
+        else:
+            await message.reply("❌ Пользователь не забанен.")
+    except TelegramAPIError as e:
+        await message.reply(f"❌ Ошибка при разблокировке: {e.message}")
+
+# Команды администратора: {команда: обработчик(message, bot, user_id, аргументы)}
+_ADMIN_HANDLERS: Dict[str, Callable[[Message, Bot, int, str], Awaitable[None]]] = {
+    '/ban': _cmd_ban,
+    '/mute': _cmd_mute,
+    '/unmute': _cmd_unmute,
+    '/unban': _cmd_unban,
+}
+
+_ADMIN_HELP = ("❓ Неизвестная команда. Доступные команды:\n"
+               "/ban [причина] - заблокировать пользователя\n"
+               "/mute [время] [причина] - замутить пользователя (пример: 1ч, 30м, 1ч30м)\n"
+               "/unmute - размутить пользователя\n"
+               "/unban - разблокировать пользователя")
+
 @router.message(
     F.chat.type.in_({'group', 'supergroup'}),
     F.reply_to_message,
@@ -282,142 +544,31 @@ async def handle_admin_commands(message: Message, bot: Bot):
         await message.reply(f"Ошибка: {err}")
         return
 
-    command_parts = message.text.strip().split(maxsplit=1)
+    command_parts = message.text.split(maxsplit=1)
     command = command_parts[0].lower()
-    logger.info(f"Admin {message.from_user.id} executed command {command} on user {user_id}")
+    logger.info("Admin %d executed command %s on user %d", message.from_user.id, command, user_id)
 
-    if command == '/ban':
-        try:
-            # Парсим причину бана
-            reason = "Заблокирован администратором"
-            if len(command_parts) > 1:
-                reason = command_parts[1].strip()
-            
-            # Добавляем в список забаненных
-            banned_users[user_id] = reason
-            
-            # Удаляем из списка замученных, если был замучен
-            if user_id in muted_users:
-                del muted_users[user_id]
-            
-            await bot.send_message(
-                chat_id=user_id,
-                text=f"⚠️ Вы были заблокированы администратором.\nПричина: {reason}"
-            )
-            await message.reply("✅ Пользователь заблокирован.")
-        except TelegramAPIError as e:
-            await message.reply(f"❌ Ошибка при блокировке: {e.message}")
+    handler = _ADMIN_HANDLERS.get(command)
+    if handler is None:
+        await message.reply(_ADMIN_HELP)
+        return
 
-    elif command == '/mute':
-        try:
-            # Проверяем, не забанен ли пользователь
-            if user_id in banned_users:
-                await message.reply("❌ Пользователь забанен. Сначала разбаньте его.")
-                return
-            
-            # Парсим время мута (по умолчанию 1 час)
-            reason = "Нарушение правил"
-            
-            if len(command_parts) > 1:
-                args = command_parts[1].strip().split(maxsplit=1)
-                duration_str = args[0]
-                if len(args) > 1:
-                    reason = args[1]
-            else:
-                duration_str = "1ч"
-            
-            # Парсим длительность
-            total_minutes, time_display = parse_duration(duration_str)
-            
-            if total_minutes <= 0:
-                total_minutes = 60  # по умолчанию 1 час
-                time_display = "1ч"
-            
-            # Добавляем в список замученных
-            unmute_time = datetime.now() + timedelta(minutes=total_minutes)
-            muted_users[user_id] = (unmute_time, reason)
-            
-            # Форматируем время окончания
-            end_time_str = unmute_time.strftime('%d.%m.%Y %H:%M')
-            
-            await bot.send_message(
-                chat_id=user_id,
-                text=f"🔇 Вы были замучены администратором на {time_display}.\n"
-                     f"Причина: {reason}\n"
-                     f"Ваши сообщения больше не будут обработаны до {end_time_str}."
-            )
-            await message.reply(f"✅ Пользователь замучен на {time_display}.")
-        except TelegramAPIError as e:
-            await message.reply(f"❌ Ошибка при муте: {e.message}")
+    if user_id in _recent_admin_actions:
+        await message.reply("⏳ Над этим пользователем только что выполнялась команда. Повторите позже.")
+        return
+    _recent_admin_actions[user_id] = True
 
-    elif command == '/unmute':
-        try:
-            # Убираем из списка замученных
-            if user_id in muted_users:
-                del muted_users[user_id]
-                await bot.send_message(
-                    chat_id=user_id,
-                    text="✅ С вас сняты ограничения. Вы можете снова писать в бота."
-                )
-                await message.reply("✅ С пользователя сняты ограничения.")
-            else:
-                await message.reply("❌ Пользователь не замучен.")
-        except TelegramAPIError as e:
-            await message.reply(f"❌ Ошибка при размуте: {e.message}")
-
-    elif command == '/unban':
-        try:
-            # Убираем из списка забаненных
-            if user_id in banned_users:
-                del banned_users[user_id]
-                await bot.send_message(
-                    chat_id=user_id,
-                    text="✅ Вы были разблокированы администратором."
-                )
-                await message.reply("✅ Пользователь разблокирован.")
-            else:
-                await message.reply("❌ Пользователь не забанен.")
-        except TelegramAPIError as e:
-            await message.reply(f"❌ Ошибка при разблокировке: {e.message}")
-
-    else:
-        await message.reply("❓ Неизвестная команда. Доступные команды:\n"
-                           "/ban [причина] - заблокировать пользователя\n"
-                           "/mute [время] [причина] - замутить пользователя (пример: 1ч, 30м, 1ч30м)\n"
-                           "/unmute - размутить пользователя\n"
-                           "/unban - разблокировать пользователя")
+    # Действие над пользователем сбрасывает его профиль в кэше /info
+    _chat_cache.pop(user_id, None)
+
+    args = command_parts[1].strip() if len(command_parts) > 1 else ''
+    await handler(message, bot, user_id, args)
 
 @router.message(SupportedMediaFilter(), F.chat.type == 'private')
 async def supported_media(message: Message, bot: Bot):
     """Обработка медиафайлов от пользователя"""
-    # Проверяем, забанен ли пользователь
-    if is_user_banned(message.from_user.id):
-        reason = banned_users[message.from_user.id]
-        await message.reply(
-            f"❌ Вы были заблокированы администратором.\n"
-            f"Причина: {reason}\n"
-            f"Ваши сообщения не будут обработаны."
-        )
-        return
-    
-    # Проверяем, замучен ли пользователь
-    if is_user_muted(message.from_user.id):
-        unmute_time, reason = muted_users[message.from_user.id]
-        remaining = unmute_time - datetime.now()
-        hours, remainder = divmod(int(remaining.total_seconds()), 3600)
-        minutes, _ = divmod(remainder, 60)
-        time_str = f"{hours}ч {minutes}мин" if hours > 0 else f"{minutes}мин"
-        
-        await message.reply(
-            f"❌ Вы были замучены администратором.\n"
-            f"Причина: {reason}\n"
-            f"Оставшееся время: {time_str}\n"
-            f"Ваши сообщения не будут обработаны до размута."
-        )
-        return
-        
-    if message.caption and len(message.caption) > 1000:
-        return await message.reply(text='Слишком длинное описание. Описание не может быть больше 1000 символов')
+    if message.caption and len(message.caption) > _MAX_CAPTION_LEN:
+        return await message.reply(text=f'Слишком длинное описание. Описание не может быть больше {_MAX_CAPTION_LEN} символов')
     
     try:
         await message.copy_to(
@@ -426,6 +577,6 @@ async def supported_media(message: Message, bot: Bot):
                      f"\n\nИмя: {message.from_user.full_name}\ntg://user?id={message.from_user.id}"),
             parse_mode="HTML"
         )
-        logger.info(f"User {message.from_user.id} sent media to group")
+        logger.info("User %d sent media to group", message.from_user.id)
     except TelegramAPIError as e:
         await message.reply(f"❌ Ошибка при отправке медиа: {e.message}")
\ No newline at end of file
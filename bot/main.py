@@ -1,4 +1,5 @@
 import asyncio
+import contextlib
 import logging
 import os
 import sys
@@ -8,7 +9,8 @@ from aiogram.dispatcher.webhook.aiohttp_server import SimpleRequestHandler
 from aiohttp import web
 from dotenv import load_dotenv
 
-from handlers import router
+from handlers import (check_mute_expirations, close_storage, init_storage,
+                      router)
 
 load_dotenv()
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
@@ -16,6 +18,9 @@ WEBHOOK_DOMAIN = os.getenv("WEBHOOK_DOMAIN")
 WEBHOOK_PATH = os.getenv("WEBHOOK_PATH")
 APP_HOST = os.getenv("APP_HOST")
 APP_PORT = os.getenv("APP_PORT")
+DB_PATH = os.getenv("DB_PATH", default="data/state.db")
+# Таймаут long polling запроса getUpdates в секундах
+POLLING_TIMEOUT = 30
 
 
 async def main():
@@ -23,12 +28,16 @@ async def main():
     bot = Bot(token=TELEGRAM_TOKEN, parse_mode="HTML")
     dp = Dispatcher()
     dp.include_router(router)
+    await init_storage(DB_PATH)
+    # Снимает истёкшие муты и уведомляет пользователей
+    expiration_task = asyncio.create_task(check_mute_expirations(bot))
 
     try:
         if not WEBHOOK_DOMAIN:
             await bot.delete_webhook()
             await dp.start_polling(
                 bot,
+                polling_timeout=POLLING_TIMEOUT,
                 allowed_updates=dp.resolve_used_update_types()
             )
         else:
@@ -53,8 +62,15 @@ async def main():
     except RuntimeError:
         pass
     finally:
+        expiration_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await expiration_task
+        await close_storage()
         await bot.session.close()
 
 
 if __name__ == "__main__":
+    if sys.platform != "win32":
+        import uvloop
+        uvloop.install()
     asyncio.run(main())
\ No newline at end of file